@@ -0,0 +1,21 @@
+import logging
+import os
+import secrets
+from fastapi import Header, HTTPException
+from typing import Optional
+
+if not os.getenv("ADMIN_TOKEN"):
+    logging.warning(
+        "ADMIN_TOKEN is not set, the admin endpoints (index migration, rollback and profiles) are unauthenticated")
+
+
+def check_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    FastAPI dependency protecting the admin endpoints with the X-Admin-Token header.
+
+    The endpoints are open unless the ADMIN_TOKEN environment variable is set.
+    """
+    expected_token = os.getenv("ADMIN_TOKEN")
+    if expected_token and not secrets.compare_digest(
+            (x_admin_token or "").encode(), expected_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, UploadFile, File
-from typing import List, Dict, Union
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from langchain.schema.document import Document
+from typing import List, Dict, Optional, Union
 import logging
 import os
 from app.services.pdf_processing import process_pdf
@@ -7,39 +9,58 @@ from app.services.docx_processing import process_docx
 from app.services.pptx_processing import process_pptx
 from app.services.xlsx_processing import process_xlsx
 from app.services.csv_processing import process_csv
-from app.services.file_postprocessing import split_data, create_embeddings_open_source
+from app.services.file_postprocessing import split_data
 from app.services.chroma_service import get_chroma_db
+from app.services.index_migration import get_active_index, create_embeddings, index_write_lock
+from app.services.upload_profiling import UploadProfile, create_upload_profile, record_slow_upload
 
 router = APIRouter()
 
 
-@router.post("/multipleupload/")
-async def multiple_upload_route(files: List[UploadFile] = File(...)) -> Dict[str, List[Dict[str, Union[str, bool]]]]:
-    results = []
+def store_documents(documents: List[Document], upload_profile: UploadProfile) -> None:
+    """
+    Store documents in the active index.
 
-    if not files:
-        return {"results": results}
+    The embeddings model is loaded before taking index_write_lock; if a migration or
+    rollback switched the active index meanwhile, the model of the new index is loaded
+    and the write is retried.
 
-    temp_dir = "data/raw"  # Directorio temporal para guardar los archivos
-    os.makedirs(temp_dir, exist_ok=True)  # Crear el directorio si no existe
+    Parameters:
+    - documents (List[Document]): The chunks to store.
+    - upload_profile (UploadProfile): The profile of the upload request.
+    """
+    active_index = get_active_index()
+    while True:
+        with upload_profile.stage("load_embeddings_model"):
+            embeddings = create_embeddings(
+                active_index["provider"], active_index["model_name"])
 
-    for file in files:
-        unique_filename = file.filename
-        file_extension = unique_filename.split(".")[-1].lower()
-        file_path = os.path.join(temp_dir, unique_filename)
+        with upload_profile.stage("index_lock_wait"):
+            index_write_lock.acquire()
+        try:
+            current_index = get_active_index()
+            if current_index == active_index:
+                with upload_profile.stage("chroma_write"):
+                    get_chroma_db(upload_profile.wrap_embeddings(embeddings), documents,
+                                  active_index["path"], recreate_chroma_db=False)
+                return
+        finally:
+            index_write_lock.release()
 
-        supported_extensions = ["pdf", "docx", "pptx", "xlsx", "csv"]
-        if file_extension not in supported_extensions:
-            error_message = f"Unsupported file extension: {file_extension}"
-            logging.error(error_message)
-            results.append({"filename": unique_filename,
-                            "status": False, "message": error_message})
-            continue
+        active_index = current_index
 
-        try:
-            with open(file_path, "wb") as out_file:
-                out_file.write(await file.read())
 
+def process_file(file_path: str, file_extension: str, upload_profile: UploadProfile) -> None:
+    """
+    Partition, split and store a saved file, under the request's profiler if it has one.
+
+    Parameters:
+    - file_path (str): The path of the saved file.
+    - file_extension (str): The lowercase extension of the file.
+    - upload_profile (UploadProfile): The profile of the upload request.
+    """
+    with upload_profile.profiling():
+        with upload_profile.stage("partition"):
             if file_extension == "pdf":
                 data = process_pdf(file_path)
             elif file_extension == "docx":
@@ -51,21 +72,69 @@ async def multiple_upload_route(files: List[UploadFile] = File(...)) -> Dict[str
             elif file_extension == "csv":
                 data = process_csv(file_path)
 
+        with upload_profile.stage("split"):
             documents = split_data(data)
-            model_name = "all-MiniLM-L6-v2"
-            embeddings = create_embeddings_open_source(model_name=model_name)
-            get_chroma_db(embeddings, documents, "chroma_docs",
-                          recreate_chroma_db=False)
-
-            results.append({"filename": unique_filename, "status": True,
-                            "message": "File processed and stored successfully"})
-        except Exception as e:
-            error_message = f"An error occurred: {str(e)}"
-            logging.exception(error_message)
-            results.append({"filename": unique_filename,
-                            "status": False, "message": error_message})
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
 
-    return {"results": results}
+        store_documents(documents, upload_profile)
+
+
+@router.post("/multipleupload/")
+async def multiple_upload_route(files: List[UploadFile] = File(...), profile: bool = False,
+                                profiler: Optional[str] = None) -> Dict[str, Union[List[Dict[str, Union[str, bool]]], Dict]]:
+    results = []
+
+    if not files:
+        return {"results": results}
+
+    try:
+        upload_profile = create_upload_profile(profile=profile, profiler=profiler)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    temp_dir = "data/raw"  # Directorio temporal para guardar los archivos
+    os.makedirs(temp_dir, exist_ok=True)  # Crear el directorio si no existe
+
+    upload_profile.start()
+    try:
+        for file in files:
+            unique_filename = file.filename
+            file_extension = unique_filename.split(".")[-1].lower()
+            file_path = os.path.join(temp_dir, unique_filename)
+
+            supported_extensions = ["pdf", "docx", "pptx", "xlsx", "csv"]
+            if file_extension not in supported_extensions:
+                error_message = f"Unsupported file extension: {file_extension}"
+                logging.error(error_message)
+                results.append({"filename": unique_filename,
+                                "status": False, "message": error_message})
+                continue
+
+            upload_profile.start_file(unique_filename)
+            try:
+                with upload_profile.stage("save_file"):
+                    with open(file_path, "wb") as out_file:
+                        out_file.write(await file.read())
+
+                # Runs in a worker thread, so processing the file and waiting for
+                # index_write_lock while a migration switches indexes do not block the event loop
+                await run_in_threadpool(process_file, file_path, file_extension, upload_profile)
+
+                results.append({"filename": unique_filename, "status": True,
+                                "message": "File processed and stored successfully"})
+            except Exception as e:
+                error_message = f"An error occurred: {str(e)}"
+                logging.exception(error_message)
+                results.append({"filename": unique_filename,
+                                "status": False, "message": error_message})
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+    finally:
+        # Also runs when the request is cancelled, so the profiler is always released
+        upload_profile.stop()
+
+    if not upload_profile.enabled:
+        return {"results": results}
+
+    record_slow_upload(upload_profile)
+    return {"results": results, "profile": upload_profile.summary()}
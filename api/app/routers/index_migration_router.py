@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, Union
+from app.routers.admin_auth import check_admin_token
+from app.services.index_migration import (
+    get_active_index, get_migration_status, start_migration, rollback_index)
+
+router = APIRouter()
+
+
+@router.post("/index/migrate/", dependencies=[Depends(check_admin_token)])
+def start_migration_route(model_name: str, provider: str = "open_source", batch_size: int = 64,
+                          pause_seconds: float = 0.5) -> Dict[str, Union[str, int, float, None]]:
+    try:
+        return start_migration(provider, model_name,
+                               batch_size=batch_size, pause_seconds=pause_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/index/migrate/status/")
+def migration_status_route() -> Dict[str, Union[str, int, float, None]]:
+    return get_migration_status()
+
+
+@router.get("/index/active/")
+def active_index_route() -> Dict[str, str]:
+    return get_active_index()
+
+
+@router.post("/index/rollback/", dependencies=[Depends(check_admin_token)])
+def rollback_index_route() -> Dict[str, Union[Dict[str, str], int]]:
+    try:
+        return rollback_index()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List
+from app.routers.admin_auth import check_admin_token
+from app.services.upload_profiling import list_slow_uploads, get_slow_upload
+
+router = APIRouter(dependencies=[Depends(check_admin_token)])
+
+
+@router.get("/admin/profiles/")
+def list_profiles_route() -> List[Dict]:
+    return list_slow_uploads()
+
+
+@router.get("/admin/profiles/{profile_id}")
+def get_profile_route(profile_id: str) -> Dict:
+    entry = get_slow_upload(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return entry
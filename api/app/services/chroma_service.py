@@ -11,7 +11,8 @@ def get_chroma_db(embeddings, documents, path, recreate_chroma_db=False):
     - embeddings: The embeddings to use for creating the Chroma vector store.
     - documents: The documents to include in the Chroma vector store.
     - path: The path where the Chroma vector store will be saved or loaded from.
-    - recreate_chroma_db (bool): If True, recreate the Chroma vector store; if False, load an existing one.
+    - recreate_chroma_db (bool): If True, recreate the Chroma vector store; if False, load an existing one
+      and add the documents to it.
 
     Returns:
     - Chroma: The Chroma vector store.
@@ -26,6 +27,8 @@ def get_chroma_db(embeddings, documents, path, recreate_chroma_db=False):
             logging.info("LOADING EXISTING CHROMA")
             chroma = Chroma(persist_directory=path,
                             embedding_function=embeddings)
+            if documents:
+                chroma.add_documents(documents)
         return chroma
     except Exception as e:
         logging.error(f"Error in get_chroma_db: {e}")
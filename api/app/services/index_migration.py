@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+
+from langchain.vectorstores import Chroma
+
+from .file_postprocessing import create_embeddings_open_source, create_embeddings_openai
+
+# File holding the pointer to the index that serves reads and writes
+ACTIVE_INDEX_FILE = "chroma_index.json"
+
+DEFAULT_INDEX = {
+    "path": "chroma_docs",
+    "provider": "open_source",
+    "model_name": "all-MiniLM-L6-v2",
+}
+
+SUPPORTED_PROVIDERS = ["open_source", "openai"]
+
+# Held by every writer of the active index, so the final catch-up pass of a
+# migration and the pointer switch cannot interleave with an upload
+index_write_lock = threading.Lock()
+
+# Migration states during which no other migration or rollback may start
+BUSY_STATES = ["running", "rolling_back"]
+
+_status_lock = threading.Lock()
+_migration_status: Dict[str, Union[str, int, float, None]] = {"state": "idle"}
+
+
+def create_embeddings(provider: str, model_name: str):
+    """
+    Create the embeddings object described by an index pointer.
+
+    Parameters:
+    - provider (str): Either "open_source" or "openai".
+    - model_name (str): The Sentence Transformer model name (ignored for OpenAI).
+
+    Returns:
+    - The embeddings object for the given provider.
+    """
+    if provider == "openai":
+        return create_embeddings_openai()
+    if provider == "open_source":
+        return create_embeddings_open_source(model_name=model_name)
+    raise ValueError(f"Unsupported embeddings provider: {provider}")
+
+
+def get_active_index() -> Dict[str, str]:
+    """
+    Read the pointer to the index currently serving traffic.
+
+    Returns:
+    - Dict[str, str]: The active index with its "path", "provider" and "model_name".
+    """
+    return _read_pointer()["active"]
+
+
+def _read_pointer() -> Dict[str, Optional[Dict[str, str]]]:
+    if not os.path.exists(ACTIVE_INDEX_FILE):
+        return {"active": dict(DEFAULT_INDEX), "previous": None}
+    with open(ACTIVE_INDEX_FILE, "r") as pointer_file:
+        return json.load(pointer_file)
+
+
+def _write_pointer(pointer: Dict[str, Optional[Dict[str, str]]]) -> None:
+    # Write to a temporary file and rename it, so readers always see either
+    # the old or the new pointer, never a partially written one
+    temp_path = f"{ACTIVE_INDEX_FILE}.tmp"
+    with open(temp_path, "w") as pointer_file:
+        json.dump(pointer, pointer_file, indent=2)
+    os.replace(temp_path, ACTIVE_INDEX_FILE)
+
+
+def get_migration_status() -> Dict[str, Union[str, int, float, None]]:
+    """
+    Return a snapshot of the progress of the current or last migration.
+    """
+    with _status_lock:
+        return dict(_migration_status)
+
+
+def _update_status(**fields) -> None:
+    with _status_lock:
+        _migration_status.update(fields)
+
+
+def _copy_chunks(source: Chroma, target: Chroma, ids: List[str]) -> int:
+    """
+    Copy the stored chunk texts and metadata of the given ids from source to target,
+    re-embedding them with the target's embeddings.
+    """
+    if not ids:
+        return 0
+    stored = source.get(ids=ids, include=["documents", "metadatas"])
+    metadatas = [metadata or {} for metadata in stored["metadatas"]]
+    target.add_texts(texts=stored["documents"],
+                     metadatas=metadatas, ids=stored["ids"])
+    return len(stored["ids"])
+
+
+def _missing_ids(source: Chroma, target: Chroma) -> List[str]:
+    source_ids = source.get(include=[])["ids"]
+    target_ids = set(target.get(include=[])["ids"])
+    return [chunk_id for chunk_id in source_ids if chunk_id not in target_ids]
+
+
+def _open_index(index: Dict[str, str]) -> Chroma:
+    return Chroma(persist_directory=index["path"],
+                  embedding_function=create_embeddings(index["provider"], index["model_name"]))
+
+
+def run_migration(new_index: Dict[str, str], batch_size: int = 64, pause_seconds: float = 0.5) -> None:
+    """
+    Build a new index with a new embeddings model from the chunks stored in the active index,
+    then switch reads to it.
+
+    Chunks are re-embedded in batches with a pause between batches, so uploads and queries
+    keep being served from the active index while the migration runs. Chunks written to the
+    active index during the migration are picked up by a final catch-up pass, done while
+    holding index_write_lock, right before the pointer is switched. The old index is kept
+    on disk and recorded as "previous" so it can be restored with rollback_index. If the
+    migration fails, the half-built new index is removed.
+
+    Parameters:
+    - new_index (Dict[str, str]): The target index with its "path", "provider" and "model_name".
+    - batch_size (int): The number of chunks to re-embed per batch.
+    - pause_seconds (float): The time to sleep between batches.
+    """
+    switched = False
+    try:
+        pointer = _read_pointer()
+        old_index = pointer["active"]
+        source = _open_index(old_index)
+        target = _open_index(new_index)
+
+        source_ids = source.get(include=[])["ids"]
+        _update_status(total=len(source_ids))
+        logging.info(
+            f"Migrating {len(source_ids)} chunks from {old_index['path']} to {new_index['path']}")
+
+        migrated = 0
+        for start in range(0, len(source_ids), batch_size):
+            if start > 0:
+                time.sleep(pause_seconds)
+            migrated += _copy_chunks(source, target,
+                                     source_ids[start:start + batch_size])
+            _update_status(migrated=migrated)
+
+        # Catch up with chunks uploaded meanwhile, without blocking uploads
+        missing = _missing_ids(source, target)
+        migrated += _copy_chunks(source, target, missing)
+
+        with index_write_lock:
+            if _read_pointer() != pointer:
+                raise RuntimeError("The active index changed during the migration")
+            migrated += _copy_chunks(source, target,
+                                     _missing_ids(source, target))
+            _write_pointer({"active": new_index, "previous": old_index})
+            switched = True
+
+        _update_status(state="completed", total=migrated, migrated=migrated,
+                       finished_at=datetime.now(timezone.utc).isoformat())
+        logging.info(f"Migration completed, now serving {new_index['path']}")
+
+    except Exception as e:
+        logging.exception(f"Error in run_migration: {e}")
+        _update_status(state="failed", error=str(e),
+                       finished_at=datetime.now(timezone.utc).isoformat())
+        if not switched:
+            # Remove the half-built index so retries do not pile up directories
+            shutil.rmtree(new_index["path"], ignore_errors=True)
+
+
+def start_migration(provider: str, model_name: str, batch_size: int = 64,
+                    pause_seconds: float = 0.5) -> Dict[str, Union[str, int, float, None]]:
+    """
+    Start a migration to a new embeddings model in a background thread.
+
+    Parameters:
+    - provider (str): Either "open_source" or "openai".
+    - model_name (str): The name of the new embeddings model.
+    - batch_size (int): The number of chunks to re-embed per batch.
+    - pause_seconds (float): The time to sleep between batches.
+
+    Returns:
+    - Dict: The initial migration status.
+
+    Raises:
+    - ValueError: If the provider, batch size or pause is invalid.
+    - RuntimeError: If another migration or a rollback is already running.
+    """
+    if provider not in SUPPORTED_PROVIDERS:
+        raise ValueError(f"Unsupported embeddings provider: {provider}")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if pause_seconds < 0:
+        raise ValueError("pause_seconds must not be negative")
+
+    new_index = {
+        "path": f"chroma_docs_{uuid.uuid4().hex[:8]}",
+        "provider": provider,
+        "model_name": model_name,
+    }
+
+    with _status_lock:
+        if _migration_status["state"] in BUSY_STATES:
+            raise RuntimeError("A migration or rollback is already running")
+        _migration_status.clear()
+        _migration_status.update({
+            "state": "running",
+            "source": get_active_index()["path"],
+            "target": new_index["path"],
+            "model_name": model_name,
+            "total": None,
+            "migrated": 0,
+            "error": None,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None,
+        })
+
+    thread = threading.Thread(target=run_migration, args=(new_index, batch_size, pause_seconds),
+                              name="index-migration", daemon=True)
+    thread.start()
+    return get_migration_status()
+
+
+def rollback_index() -> Dict[str, Union[Dict[str, str], int]]:
+    """
+    Switch reads and writes back to the index that was active before the last migration.
+
+    Chunks uploaded to the current index since the migration are first re-embedded into
+    the previous index, so rolling back does not lose them. The rollback is reported in
+    the migration status and no migration can start while it runs.
+
+    Returns:
+    - Dict: The index now "active" and the number of "restored_chunks" copied back to it.
+
+    Raises:
+    - RuntimeError: If a migration or rollback is running or there is no previous index.
+    """
+    if not _read_pointer().get("previous"):
+        raise RuntimeError("There is no previous index to roll back to")
+
+    with _status_lock:
+        if _migration_status["state"] in BUSY_STATES:
+            raise RuntimeError("Cannot roll back while a migration or rollback is running")
+        _migration_status.clear()
+        _migration_status.update({
+            "state": "rolling_back",
+            "error": None,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None,
+        })
+
+    try:
+        pointer = _read_pointer()
+        if not pointer.get("previous"):
+            raise RuntimeError("There is no previous index to roll back to")
+        _update_status(source=pointer["active"]["path"],
+                       target=pointer["previous"]["path"])
+        current = _open_index(pointer["active"])
+        previous = _open_index(pointer["previous"])
+
+        # Catch up without blocking uploads, then again under the lock right before switching
+        restored = _copy_chunks(current, previous,
+                                _missing_ids(current, previous))
+        with index_write_lock:
+            if _read_pointer() != pointer:
+                raise RuntimeError("The active index changed during the rollback")
+            restored += _copy_chunks(current, previous,
+                                     _missing_ids(current, previous))
+            _write_pointer(
+                {"active": pointer["previous"], "previous": pointer["active"]})
+    except Exception as e:
+        logging.exception(f"Error in rollback_index: {e}")
+        _update_status(state="failed", error=str(e),
+                       finished_at=datetime.now(timezone.utc).isoformat())
+        raise
+
+    _update_status(state="rolled_back", restored=restored,
+                   finished_at=datetime.now(timezone.utc).isoformat())
+    logging.info(
+        f"Rolled back to index {pointer['previous']['path']}, restored {restored} chunks")
+    return {"active": pointer["previous"], "restored_chunks": restored}
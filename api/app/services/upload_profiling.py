@@ -0,0 +1,299 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+SUPPORTED_PROFILERS = ["none", "cprofile", "pyinstrument"]
+
+
+def _configured_profiler() -> str:
+    profiler = os.getenv("UPLOAD_PROFILER", "none")
+    if profiler not in SUPPORTED_PROFILERS:
+        logging.warning(f"Unsupported UPLOAD_PROFILER {profiler}, using none")
+        return "none"
+    if profiler == "pyinstrument" and PyinstrumentProfiler is None:
+        logging.warning("UPLOAD_PROFILER is pyinstrument but it is not installed, using none")
+        return "none"
+    return profiler
+
+
+# Fraction of upload requests profiled without being asked to (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("UPLOAD_PROFILE_SAMPLE_RATE", "0"))
+# Profiler used for sampled requests: "none", "cprofile" or "pyinstrument"
+PROFILE_PROFILER = _configured_profiler()
+# Profiled requests slower than this are kept in the flight recorder
+PROFILE_THRESHOLD_SECONDS = float(
+    os.getenv("UPLOAD_PROFILE_THRESHOLD_SECONDS", "30"))
+PROFILE_DIR = os.getenv("UPLOAD_PROFILE_DIR", "data/profiles")
+PROFILE_MAX_ENTRIES = int(os.getenv("UPLOAD_PROFILE_MAX_ENTRIES", "20"))
+
+_recorder_lock = threading.Lock()
+# Held by the request whose work is being profiled with cProfile or pyinstrument, so
+# profiles of concurrent requests do not interfere with each other
+_profiler_lock = threading.Lock()
+
+
+class UploadProfile:
+    """
+    Per-request stage timer for the upload endpoint, with an optional cProfile or
+    pyinstrument profile of the whole request.
+
+    When disabled, stage() does nothing, so the route can be instrumented unconditionally.
+    Stage times are exclusive: time spent in a nested stage (for example "embedding"
+    inside "chroma_write") is not counted again in the outer stage.
+
+    The cProfile or pyinstrument profile only covers code run inside profiling(), which
+    the route uses in the worker thread processing each file, so it includes partitioning,
+    splitting, model loading, embedding and the Chroma write, but not other requests'
+    coroutines running on the event loop meanwhile. Only one request at a time gets a
+    profile; concurrent profiled requests record stage timings only.
+    """
+
+    def __init__(self, enabled: bool = False, profiler: str = "none"):
+        if enabled and profiler not in SUPPORTED_PROFILERS:
+            raise ValueError(f"Unsupported profiler: {profiler}")
+        if enabled and profiler == "pyinstrument" and PyinstrumentProfiler is None:
+            raise ValueError("pyinstrument is not installed")
+
+        self.enabled = enabled
+        self.profiler_name = profiler if enabled else "none"
+        self.id = uuid.uuid4().hex
+        self.files: List[Dict[str, Union[str, Dict[str, float]]]] = []
+        self._stack: List[List[Union[str, float]]] = []
+        self._profiler = None
+        self._started_at = None
+        self._start = None
+        self.total_seconds = None
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        self._start = time.perf_counter()
+        if self.profiler_name == "none":
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            logging.warning(
+                f"Another upload is being profiled, recording stage timings only for {self.id}")
+            return
+        if self.profiler_name == "cprofile":
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = PyinstrumentProfiler(async_mode="disabled")
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        self.total_seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            _profiler_lock.release()
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        """
+        Run the cProfile or pyinstrument profiler, if this request has one, on the current
+        thread. Can be entered several times, from different threads, one at a time; the
+        profile accumulates across them.
+        """
+        if self._profiler is None:
+            yield
+            return
+
+        try:
+            if self.profiler_name == "cprofile":
+                self._profiler.enable()
+            else:
+                self._profiler.start()
+        except (ValueError, RuntimeError) as e:
+            # Another profiling tool, such as a debugger, is already active
+            logging.warning(f"Could not start {self.profiler_name}: {e}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            if self.profiler_name == "cprofile":
+                self._profiler.disable()
+            else:
+                self._profiler.stop()
+
+    def start_file(self, filename: str) -> None:
+        if self.enabled:
+            self.files.append({"filename": filename, "stages": {}})
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled or not self.files:
+            yield
+            return
+
+        # Each frame holds the stage name and the time spent in its nested stages
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            stages = self.files[-1]["stages"]
+            stages[name] = stages.get(name, 0.0) + elapsed - frame[1]
+
+    def wrap_embeddings(self, embeddings):
+        """
+        Wrap an embeddings object so the time spent computing embeddings is recorded
+        as its own "embedding" stage.
+        """
+        if not self.enabled:
+            return embeddings
+        return _TimedEmbeddings(embeddings, self)
+
+    def profile_text(self) -> Optional[str]:
+        if self._profiler is None:
+            return None
+        if self.profiler_name == "cprofile":
+            if not self._profiler.getstats():
+                return None
+            output = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(50)
+            return output.getvalue()
+        if self._profiler.last_session is None:
+            return None
+        return self._profiler.output_text()
+
+    def summary(self) -> Dict[str, Union[str, float, List, None]]:
+        return {
+            "id": self.id,
+            "started_at": self._started_at,
+            "total_seconds": self.total_seconds,
+            "profiler": self.profiler_name,
+            "files": self.files,
+        }
+
+
+class _TimedEmbeddings:
+    def __init__(self, embeddings, profile: UploadProfile):
+        self._embeddings = embeddings
+        self._profile = profile
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._profile.stage("embedding"):
+            return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._profile.stage("embedding"):
+            return self._embeddings.embed_query(text)
+
+    def __getattr__(self, name):
+        return getattr(self._embeddings, name)
+
+
+def create_upload_profile(profile: bool = False, profiler: Optional[str] = None) -> UploadProfile:
+    """
+    Create the profile for an upload request, enabled when requested explicitly or
+    when the request is picked by sampling.
+
+    Parameters:
+    - profile (bool): If True, profile this request regardless of sampling.
+    - profiler (Optional[str]): "none", "cprofile" or "pyinstrument". Passing a profiler
+      also enables profiling; sampled requests use UPLOAD_PROFILER.
+
+    Returns:
+    - UploadProfile: The profile for the request.
+
+    Raises:
+    - ValueError: If the requested profiler is unsupported or not installed.
+    """
+    if profiler is not None:
+        return UploadProfile(enabled=True, profiler=profiler)
+    enabled = profile or random.random() < PROFILE_SAMPLE_RATE
+    return UploadProfile(enabled=enabled, profiler=PROFILE_PROFILER)
+
+
+def record_slow_upload(upload_profile: UploadProfile) -> bool:
+    """
+    Store the profile in the on-disk flight recorder if the request was slower than
+    the threshold, dropping the oldest entries beyond PROFILE_MAX_ENTRIES.
+
+    Parameters:
+    - upload_profile (UploadProfile): A stopped profile.
+
+    Returns:
+    - bool: True if the profile was stored.
+    """
+    if not upload_profile.enabled or upload_profile.total_seconds < PROFILE_THRESHOLD_SECONDS:
+        return False
+
+    entry = upload_profile.summary()
+    entry["profile"] = upload_profile.profile_text()
+    # Time-ordered file names, so the ring buffer can be pruned by name
+    filename = f"{time.time_ns()}_{upload_profile.id}.json"
+
+    try:
+        with _recorder_lock:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, filename), "w") as profile_file:
+                json.dump(entry, profile_file)
+            for old_filename in _list_profile_files()[PROFILE_MAX_ENTRIES:]:
+                os.remove(os.path.join(PROFILE_DIR, old_filename))
+        logging.info(
+            f"Slow upload recorded: {upload_profile.id} ({upload_profile.total_seconds:.1f}s)")
+        return True
+    except OSError as e:
+        logging.error(f"Error in record_slow_upload: {e}")
+        return False
+
+
+def _list_profile_files() -> List[str]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+
+
+def _read_profile_file(filename: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(PROFILE_DIR, filename), "r") as profile_file:
+            return json.load(profile_file)
+    except (OSError, ValueError):
+        # Pruned or being written while listing
+        return None
+
+
+def list_slow_uploads() -> List[Dict[str, Union[str, float, None]]]:
+    """
+    List the profiles kept in the flight recorder, newest first, without their profile output.
+    """
+    entries = []
+    for filename in _list_profile_files():
+        entry = _read_profile_file(filename)
+        if entry is not None:
+            entries.append({key: entry[key] for key in ("id", "started_at", "total_seconds", "profiler")})
+    return entries
+
+
+def get_slow_upload(profile_id: str) -> Optional[Dict]:
+    """
+    Return a profile kept in the flight recorder, or None if it is not (or no longer) stored.
+    """
+    for filename in _list_profile_files():
+        if filename.endswith(f"_{profile_id}.json"):
+            return _read_profile_file(filename)
+    return None
@@ -4,6 +4,8 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.file_upload_router import router as file_upload_router
+from app.routers.index_migration_router import router as index_migration_router
+from app.routers.profiling_router import router as profiling_router
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -37,3 +39,13 @@ app.include_router(
     file_upload_router,
     tags=["documents"]
 )
+
+app.include_router(
+    index_migration_router,
+    tags=["index"]
+)
+
+app.include_router(
+    profiling_router,
+    tags=["admin"]
+)
@@ -3,3 +3,6 @@ import os
 
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../')))
+# The routers import the services as "app.*", like when running from the api folder
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../api')))
@@ -0,0 +1,127 @@
+import pytest
+from unittest.mock import Mock, patch
+from chromadb.api.client import SharedSystemClient
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain.embeddings.fake import FakeEmbeddings
+from langchain.schema.document import Document
+from langchain.vectorstores import Chroma
+from app.routers.file_upload_router import router, store_documents
+from app.services import index_migration, upload_profiling
+from app.services.upload_profiling import UploadProfile
+
+app = FastAPI()
+app.include_router(router)
+
+
+@pytest.fixture(autouse=True)
+def isolated_index(tmp_path, monkeypatch) -> None:
+    """
+    Run each test in a temporary directory, so indexes and the active index pointer
+    are created there.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANONYMIZED_TELEMETRY", "False")
+    # Chroma caches its clients by (relative) path, which now points to another directory
+    SharedSystemClient.clear_system_cache()
+
+
+def stored_texts(path: str) -> list:
+    """
+    Read back the chunk texts stored in a Chroma index.
+    """
+    chroma = Chroma(persist_directory=path, embedding_function=FakeEmbeddings(size=8))
+    return sorted(chroma.get(include=["documents"])["documents"])
+
+
+@patch('app.services.index_migration.time.sleep')
+@patch('app.services.index_migration.create_embeddings')
+@patch('app.routers.file_upload_router.create_embeddings')
+def test_store_documents_after_migration(mock_router_embeddings: Mock, mock_migration_embeddings: Mock,
+                                         mock_sleep: Mock) -> None:
+    """
+    Test that uploads are stored in an existing index, and that after a migration they
+    are stored in the new index.
+    """
+    mock_router_embeddings.return_value = FakeEmbeddings(size=8)
+    mock_migration_embeddings.return_value = FakeEmbeddings(size=8)
+    upload_profile = UploadProfile()
+
+    store_documents([Document(page_content="first")], upload_profile)
+    store_documents([Document(page_content="second")], upload_profile)
+    assert stored_texts("chroma_docs") == ["first", "second"]
+
+    new_index = {"path": "chroma_docs_new", "provider": "open_source", "model_name": "new-model"}
+    index_migration.run_migration(new_index, pause_seconds=0)
+    assert index_migration.get_migration_status()["state"] == "completed"
+
+    store_documents([Document(page_content="third")], upload_profile)
+    assert stored_texts("chroma_docs_new") == ["first", "second", "third"]
+    assert stored_texts("chroma_docs") == ["first", "second"]
+
+
+@patch('app.routers.file_upload_router.get_chroma_db')
+@patch('app.routers.file_upload_router.create_embeddings')
+def test_store_documents_retries_when_index_switched(mock_embeddings: Mock, mock_get_chroma_db: Mock) -> None:
+    """
+    Test that when the active index switches while the embeddings model loads, the model
+    of the new index is loaded and the documents are written to the new index.
+    """
+    new_index = {"path": "chroma_docs_new", "provider": "openai", "model_name": "ada"}
+
+    def load_model(provider, model_name):
+        if mock_embeddings.call_count == 1:
+            index_migration._write_pointer(
+                {"active": new_index, "previous": index_migration.DEFAULT_INDEX})
+        return Mock(name=model_name)
+
+    mock_embeddings.side_effect = load_model
+    documents = [Document(page_content="chunk")]
+
+    store_documents(documents, UploadProfile())
+
+    assert [call.args for call in mock_embeddings.call_args_list] == [
+        ("open_source", "all-MiniLM-L6-v2"), ("openai", "ada")]
+    mock_get_chroma_db.assert_called_once()
+    assert mock_get_chroma_db.call_args.args[1] is documents
+    assert mock_get_chroma_db.call_args.args[2] == "chroma_docs_new"
+
+
+@patch('app.routers.file_upload_router.create_embeddings')
+@patch('app.routers.file_upload_router.process_pdf')
+def test_upload_route_profile_breakdown(mock_process_pdf: Mock, mock_embeddings: Mock, monkeypatch) -> None:
+    """
+    Test that a profiled upload into an existing index reports every stage, including
+    embedding and the Chroma write, and that its cProfile profile covers the work done
+    in the worker thread.
+    """
+    monkeypatch.setattr(upload_profiling, "PROFILE_THRESHOLD_SECONDS", 0.0)
+    monkeypatch.setattr(upload_profiling, "PROFILE_DIR", "profiles")
+    mock_process_pdf.return_value = [Document(page_content="Test Content", metadata={"page": 1})]
+    mock_embeddings.return_value = FakeEmbeddings(size=8)
+    client = TestClient(app)
+    files = {"files": ("file.pdf", b"%PDF", "application/pdf")}
+
+    # The first upload creates the index, the profiled one writes to the existing index
+    assert client.post("/multipleupload/", files=files).json() == {"results": [
+        {"filename": "file.pdf", "status": True, "message": "File processed and stored successfully"}]}
+    response = client.post("/multipleupload/?profile=true&profiler=cprofile", files=files).json()
+
+    assert response["results"][0]["status"] is True
+    profile = response["profile"]
+    assert profile["files"][0]["filename"] == "file.pdf"
+    assert set(profile["files"][0]["stages"]) == {
+        "save_file", "partition", "split", "load_embeddings_model", "index_lock_wait",
+        "chroma_write", "embedding"}
+    assert stored_texts("chroma_docs") == ["Test Content", "Test Content"]
+    assert "store_documents" in upload_profiling.get_slow_upload(profile["id"])["profile"]
+
+
+def test_upload_route_rejects_invalid_profiler() -> None:
+    """
+    Test that an explicitly requested unknown profiler is reported as 400.
+    """
+    client = TestClient(app)
+    files = {"files": ("file.pdf", b"%PDF", "application/pdf")}
+
+    assert client.post("/multipleupload/?profiler=unknown", files=files).status_code == 400
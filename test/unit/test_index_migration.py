@@ -0,0 +1,188 @@
+import json
+import os
+import pytest
+from unittest.mock import Mock, patch
+from api.app.services import index_migration
+
+
+@pytest.fixture(autouse=True)
+def isolated_pointer(tmp_path, monkeypatch) -> None:
+    """
+    Run each test in a temporary directory with an idle migration status.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(index_migration, "_migration_status", {"state": "idle"})
+
+
+def make_store(ids, texts=None):
+    """
+    Build a mock Chroma store holding the given chunk ids.
+    """
+    store = Mock()
+    store.data = {chunk_id: (texts or {}).get(chunk_id, f"text {chunk_id}") for chunk_id in ids}
+
+    def get(ids=None, include=None):
+        selected = ids if ids is not None else list(store.data)
+        return {"ids": selected,
+                "documents": [store.data[chunk_id] for chunk_id in selected],
+                "metadatas": [None for _ in selected]}
+
+    def add_texts(texts, metadatas, ids):
+        store.data.update(zip(ids, texts))
+
+    store.get.side_effect = get
+    store.add_texts.side_effect = add_texts
+    return store
+
+
+def test_get_active_index_default() -> None:
+    """
+    Test that the default index is served when no pointer file exists.
+    """
+    assert index_migration.get_active_index() == index_migration.DEFAULT_INDEX
+
+
+@patch('api.app.services.index_migration.time.sleep')
+@patch('api.app.services.index_migration.create_embeddings')
+@patch('api.app.services.index_migration.Chroma')
+def test_run_migration_switches_pointer(mock_chroma: Mock, mock_embeddings: Mock, mock_sleep: Mock) -> None:
+    """
+    Test that run_migration copies every chunk in batches, then switches the active index
+    and keeps the old one as previous.
+    """
+    source = make_store(["a", "b", "c"])
+    target = make_store([])
+    mock_chroma.side_effect = [source, target]
+    new_index = {"path": "chroma_docs_new", "provider": "open_source", "model_name": "new-model"}
+
+    index_migration.run_migration(new_index, batch_size=2, pause_seconds=0)
+
+    assert target.data == source.data
+    assert mock_sleep.call_count == 1
+    assert index_migration.get_active_index() == new_index
+    with open(index_migration.ACTIVE_INDEX_FILE) as pointer_file:
+        assert json.load(pointer_file)["previous"] == index_migration.DEFAULT_INDEX
+    status = index_migration.get_migration_status()
+    assert status["state"] == "completed"
+    assert status["migrated"] == 3
+
+
+@patch('api.app.services.index_migration.create_embeddings')
+@patch('api.app.services.index_migration.Chroma')
+def test_run_migration_failure_keeps_active_index(mock_chroma: Mock, mock_embeddings: Mock) -> None:
+    """
+    Test that a failed migration reports the error, removes the half-built index and
+    leaves reads on the old index.
+    """
+    os.makedirs("chroma_docs_new")
+    source = make_store(["a"])
+    target = make_store([])
+    target.add_texts.side_effect = Exception("Embedding error")
+    mock_chroma.side_effect = [source, target]
+
+    index_migration.run_migration(
+        {"path": "chroma_docs_new", "provider": "open_source", "model_name": "new-model"}, pause_seconds=0)
+
+    assert not os.path.exists(index_migration.ACTIVE_INDEX_FILE)
+    assert not os.path.exists("chroma_docs_new")
+    status = index_migration.get_migration_status()
+    assert status["state"] == "failed"
+    assert "Embedding error" in status["error"]
+
+
+@patch('api.app.services.index_migration.create_embeddings')
+@patch('api.app.services.index_migration.Chroma')
+def test_run_migration_fails_when_pointer_changed(mock_chroma: Mock, mock_embeddings: Mock) -> None:
+    """
+    Test that a migration does not overwrite a pointer switched meanwhile, for example
+    by a rollback, and removes its half-built index.
+    """
+    rolled_back = {"path": "chroma_docs_old", "provider": "open_source", "model_name": "old-model"}
+    source = make_store(["a"])
+    target = make_store([])
+
+    def add_texts(texts, metadatas, ids):
+        index_migration._write_pointer({"active": rolled_back, "previous": None})
+
+    target.add_texts.side_effect = add_texts
+    mock_chroma.side_effect = [source, target]
+
+    index_migration.run_migration(
+        {"path": "chroma_docs_new", "provider": "open_source", "model_name": "new-model"}, pause_seconds=0)
+
+    assert index_migration.get_active_index() == rolled_back
+    status = index_migration.get_migration_status()
+    assert status["state"] == "failed"
+    assert "changed" in status["error"]
+
+
+def test_start_migration_rejects_concurrent_run() -> None:
+    """
+    Test that only one migration can run at a time.
+    """
+    index_migration._migration_status["state"] = "running"
+    with pytest.raises(RuntimeError):
+        index_migration.start_migration("open_source", "new-model")
+
+
+@pytest.mark.parametrize("provider, batch_size, pause_seconds", [
+    ("unknown", 64, 0.5),
+    ("open_source", 0, 0.5),
+    ("open_source", 64, -1),
+])
+def test_start_migration_rejects_invalid_arguments(provider: str, batch_size: int, pause_seconds: float) -> None:
+    """
+    Test that invalid arguments are rejected before a migration starts.
+    """
+    with pytest.raises(ValueError):
+        index_migration.start_migration(provider, "new-model", batch_size=batch_size,
+                                        pause_seconds=pause_seconds)
+    assert index_migration.get_migration_status()["state"] == "idle"
+
+
+@patch('api.app.services.index_migration.create_embeddings')
+@patch('api.app.services.index_migration.Chroma')
+def test_rollback_index(mock_chroma: Mock, mock_embeddings: Mock) -> None:
+    """
+    Test that rollback_index copies chunks uploaded after the migration back to the
+    previous index, then swaps the active and previous indexes.
+    """
+    new_index = {"path": "chroma_docs_new", "provider": "openai", "model_name": "ada"}
+    index_migration._write_pointer({"active": new_index, "previous": index_migration.DEFAULT_INDEX})
+    current = make_store(["a", "b"])
+    previous = make_store(["a"])
+    mock_chroma.side_effect = [current, previous]
+
+    result = index_migration.rollback_index()
+
+    assert result == {"active": index_migration.DEFAULT_INDEX, "restored_chunks": 1}
+    assert previous.data == current.data
+    assert index_migration.get_active_index() == index_migration.DEFAULT_INDEX
+    assert index_migration.get_migration_status()["state"] == "rolled_back"
+
+
+def test_rollback_rejected_while_busy() -> None:
+    """
+    Test that a rollback cannot start while a migration or another rollback runs, and
+    that a migration cannot start during a rollback.
+    """
+    new_index = {"path": "chroma_docs_new", "provider": "openai", "model_name": "ada"}
+    index_migration._write_pointer({"active": new_index, "previous": index_migration.DEFAULT_INDEX})
+
+    for state in index_migration.BUSY_STATES:
+        index_migration._migration_status["state"] = state
+        with pytest.raises(RuntimeError):
+            index_migration.rollback_index()
+        with pytest.raises(RuntimeError):
+            index_migration.start_migration("open_source", "new-model")
+    assert index_migration.get_active_index() == new_index
+
+
+def test_rollback_index_without_previous() -> None:
+    """
+    Test that rollback_index fails when there is no previous index.
+    """
+    index_migration._write_pointer({"active": index_migration.DEFAULT_INDEX, "previous": None})
+
+    with pytest.raises(RuntimeError):
+        index_migration.rollback_index()
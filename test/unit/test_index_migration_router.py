@@ -0,0 +1,43 @@
+import pytest
+from unittest.mock import Mock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers.index_migration_router import router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("url", ["/index/migrate/?model_name=new-model", "/index/rollback/"])
+@patch('app.routers.index_migration_router.rollback_index')
+@patch('app.routers.index_migration_router.start_migration')
+def test_admin_routes_require_token(mock_start: Mock, mock_rollback: Mock, url: str, monkeypatch) -> None:
+    """
+    Test that the migrate and rollback routes reject requests without the admin token
+    when ADMIN_TOKEN is set, and accept the right one.
+    """
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    mock_start.return_value = {"state": "running"}
+    mock_rollback.return_value = {"active": {"path": "chroma_docs"}, "restored_chunks": 0}
+
+    assert client.post(url).status_code == 403
+    assert client.post(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    mock_start.assert_not_called()
+    mock_rollback.assert_not_called()
+
+    assert client.post(url, headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+@patch('app.routers.index_migration_router.start_migration')
+def test_migrate_route_rejects_invalid_arguments(mock_start: Mock, monkeypatch) -> None:
+    """
+    Test that invalid migration arguments are reported as 400.
+    """
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    mock_start.side_effect = ValueError("pause_seconds must not be negative")
+
+    response = client.post("/index/migrate/?model_name=new-model&pause_seconds=-1")
+
+    assert response.status_code == 400
+    assert "pause_seconds" in response.json()["detail"]
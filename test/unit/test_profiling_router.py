@@ -0,0 +1,66 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers.profiling_router import router
+from app.services import upload_profiling
+from app.services.upload_profiling import UploadProfile
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch) -> None:
+    """
+    Keep the flight recorder in a temporary directory, with every profile kept.
+    """
+    monkeypatch.setattr(upload_profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(upload_profiling, "PROFILE_THRESHOLD_SECONDS", 0.0)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+
+def record_profile(total_seconds: float) -> UploadProfile:
+    """
+    Store a profile with the given latency in the flight recorder.
+    """
+    upload_profile = UploadProfile(enabled=True)
+    upload_profile.total_seconds = total_seconds
+    upload_profiling.record_slow_upload(upload_profile)
+    return upload_profile
+
+
+def test_list_and_get_profiles() -> None:
+    """
+    Test that recorded profiles are listed newest first and can be fetched by id.
+    """
+    older = record_profile(40.0)
+    newer = record_profile(90.0)
+
+    response = client.get("/admin/profiles/")
+    assert response.status_code == 200
+    assert [entry["id"] for entry in response.json()] == [newer.id, older.id]
+
+    response = client.get(f"/admin/profiles/{older.id}")
+    assert response.status_code == 200
+    assert response.json()["total_seconds"] == 40.0
+
+
+def test_get_unknown_profile() -> None:
+    """
+    Test that an unknown or pruned profile is reported as 404.
+    """
+    assert client.get("/admin/profiles/unknown").status_code == 404
+
+
+def test_profiles_require_token(monkeypatch) -> None:
+    """
+    Test that the profile routes require the admin token when ADMIN_TOKEN is set.
+    """
+    upload_profile = record_profile(90.0)
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+    assert client.get("/admin/profiles/").status_code == 403
+    assert client.get(f"/admin/profiles/{upload_profile.id}",
+                      headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles/", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,171 @@
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from api.app.services import upload_profiling
+from api.app.services.upload_profiling import UploadProfile
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch) -> None:
+    """
+    Keep the flight recorder in a temporary directory.
+    """
+    monkeypatch.setattr(upload_profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+
+
+def test_disabled_profile_records_nothing() -> None:
+    """
+    Test that a disabled profile leaves the embeddings untouched and records no stages.
+    """
+    upload_profile = UploadProfile(enabled=False)
+    embeddings = Mock()
+    upload_profile.start()
+    upload_profile.start_file("file.pdf")
+    with upload_profile.stage("partition"):
+        pass
+    upload_profile.stop()
+
+    assert upload_profile.wrap_embeddings(embeddings) is embeddings
+    assert upload_profile.files == []
+    assert upload_profiling.record_slow_upload(upload_profile) is False
+
+
+@patch('api.app.services.upload_profiling.time.perf_counter')
+def test_nested_stages_are_exclusive(mock_perf_counter: Mock) -> None:
+    """
+    Test that time spent computing embeddings is not counted again in the Chroma write stage.
+    """
+    mock_perf_counter.side_effect = [0.0, 1.0, 3.0, 7.0, 10.0, 11.0]
+    upload_profile = UploadProfile(enabled=True)
+    embeddings = upload_profile.wrap_embeddings(Mock())
+
+    upload_profile.start()
+    upload_profile.start_file("file.pdf")
+    with upload_profile.stage("chroma_write"):
+        embeddings.embed_documents(["chunk"])
+    upload_profile.stop()
+
+    assert upload_profile.files[0]["stages"] == {"embedding": 4.0, "chroma_write": 5.0}
+    assert upload_profile.total_seconds == 11.0
+
+
+def partition_stub() -> None:
+    """
+    Stand-in for the work run in the worker thread during an upload.
+    """
+    sorted(range(1000))
+
+
+def test_cprofile_output_covers_worker_threads() -> None:
+    """
+    Test that the cProfile profile of the request includes the work run under
+    profiling() in worker threads.
+    """
+    upload_profile = UploadProfile(enabled=True, profiler="cprofile")
+
+    def process_file() -> None:
+        with upload_profile.profiling():
+            partition_stub()
+
+    upload_profile.start()
+    for _ in range(2):
+        worker = threading.Thread(target=process_file)
+        worker.start()
+        worker.join()
+    upload_profile.stop()
+
+    assert "partition_stub" in upload_profile.profile_text()
+
+
+def test_unsupported_profiler() -> None:
+    """
+    Test that an unknown profiler is rejected.
+    """
+    with pytest.raises(ValueError):
+        UploadProfile(enabled=True, profiler="unknown")
+
+
+def test_flight_recorder_keeps_newest_slow_uploads(monkeypatch) -> None:
+    """
+    Test that only uploads above the threshold are kept, up to PROFILE_MAX_ENTRIES.
+    """
+    monkeypatch.setattr(upload_profiling, "PROFILE_THRESHOLD_SECONDS", 5.0)
+    monkeypatch.setattr(upload_profiling, "PROFILE_MAX_ENTRIES", 2)
+
+    profiles = []
+    for total_seconds in [1.0, 6.0, 7.0, 8.0]:
+        upload_profile = UploadProfile(enabled=True)
+        upload_profile.total_seconds = total_seconds
+        upload_profiling.record_slow_upload(upload_profile)
+        profiles.append(upload_profile)
+
+    listed = upload_profiling.list_slow_uploads()
+    assert [entry["total_seconds"] for entry in listed] == [8.0, 7.0]
+    assert upload_profiling.get_slow_upload(profiles[3].id)["total_seconds"] == 8.0
+    assert upload_profiling.get_slow_upload(profiles[1].id) is None
+
+
+def test_concurrent_profiles_record_stage_timings_only() -> None:
+    """
+    Test that a second profiled request does not start another profiler, and that the
+    profiler can be started again once the first request stops.
+    """
+    first = UploadProfile(enabled=True, profiler="cprofile")
+    second = UploadProfile(enabled=True, profiler="cprofile")
+    first.start()
+    second.start()
+    with first.profiling(), second.profiling():
+        partition_stub()
+    second.stop()
+    first.stop()
+
+    assert first.profile_text() is not None
+    assert second.profile_text() is None
+
+    third = UploadProfile(enabled=True, profiler="cprofile")
+    third.start()
+    with third.profiling():
+        partition_stub()
+    third.stop()
+    assert third.profile_text() is not None
+
+
+def test_explicit_profiler_enables_profiling() -> None:
+    """
+    Test that passing a profiler enables profiling, and that an invalid one is rejected.
+    """
+    assert upload_profiling.create_upload_profile(profiler="cprofile").enabled
+
+    with pytest.raises(ValueError):
+        upload_profiling.create_upload_profile(profiler="unknown")
+
+
+@patch('api.app.services.upload_profiling.random.random')
+def test_create_upload_profile_sampling(mock_random: Mock, monkeypatch) -> None:
+    """
+    Test that requests are profiled when picked by sampling, with the configured profiler.
+    """
+    monkeypatch.setattr(upload_profiling, "PROFILE_SAMPLE_RATE", 0.1)
+    monkeypatch.setattr(upload_profiling, "PROFILE_PROFILER", "cprofile")
+
+    mock_random.return_value = 0.05
+    sampled = upload_profiling.create_upload_profile()
+    assert sampled.enabled
+    assert sampled.profiler_name == "cprofile"
+
+    mock_random.return_value = 0.5
+    assert not upload_profiling.create_upload_profile().enabled
+    assert upload_profiling.create_upload_profile(profile=True).enabled
+
+
+def test_invalid_configured_profiler_falls_back(monkeypatch) -> None:
+    """
+    Test that an invalid UPLOAD_PROFILER falls back to stage timings only instead of
+    failing sampled requests.
+    """
+    monkeypatch.setenv("UPLOAD_PROFILER", "unknown")
+    assert upload_profiling._configured_profiler() == "none"
+
+    monkeypatch.setenv("UPLOAD_PROFILER", "pyinstrument")
+    monkeypatch.setattr(upload_profiling, "PyinstrumentProfiler", None)
+    assert upload_profiling._configured_profiler() == "none"